@@ -21,32 +21,53 @@ UUIDs del servicio SDN:
 
 Dependencias:
   pip install bleak
+  pip install orjson   # Opcional: JSON más rápido en el hot path BLE
 
 Uso:
   python3 sdn_ble_bridge.py                  # Busca y conecta al teléfono
   python3 sdn_ble_bridge.py --scan           # Solo escanea dispositivos BLE
+  python3 sdn_ble_bridge.py --scan -v        # Incluye candidatos por nombre
   python3 sdn_ble_bridge.py --mac XX:XX:...  # Conecta a MAC específica
   python3 sdn_ble_bridge.py --send '{"action":"PREPARE_BT"}'  # Envía comando
 """
 
 import asyncio
+import atexit
 import json
 import logging
+import logging.handlers
 import os
+import queue
+import shlex
+import shutil
 import signal
-import subprocess
 import sys
-import time
-from typing import Optional
+from collections import defaultdict
+from typing import Optional, Union
 
 try:
     from bleak import BleakClient, BleakScanner
     from bleak.backends.characteristic import BleakGATTCharacteristic
+    from bleak.backends.device import BLEDevice
+    from bleak.backends.scanner import AdvertisementData
 except ImportError:
     print("ERROR: Instala bleak primero:")
     print("  pip install bleak")
     sys.exit(1)
 
+# orjson es opcional: si no está, se usa json de la stdlib.
+# Ambas variantes devuelven bytes en dumps y aceptan bytes en loads.
+try:
+    import orjson
+
+    _json_dumps = orjson.dumps
+    _json_loads = orjson.loads
+except ImportError:
+    def _json_dumps(obj) -> bytes:
+        return json.dumps(obj).encode("utf-8")
+
+    _json_loads = json.loads
+
 # ─── Configuración ───────────────────────────────────────────
 
 SDN_SERVICE_UUID = "a1b2c3d4-e5f6-7890-abcd-ef1234567890"
@@ -54,15 +75,34 @@ SDN_CMD_WRITE_UUID = "a1b2c3d4-0001-7890-abcd-ef1234567890"
 SDN_RESPONSE_UUID = "a1b2c3d4-0002-7890-abcd-ef1234567890"
 SDN_RADIO_REQ_UUID = "a1b2c3d4-0003-7890-abcd-ef1234567890"
 
+# Precalculados para el filtro de scan
+SDN_SERVICE_UUID_LC = SDN_SERVICE_UUID.lower()
+_SDN_NAME_HINTS = ("sdn", "xiaomi")
+
+# MTU por debajo del cual casi todo JSON se fragmenta
+MIN_RECOMMENDED_MTU = 100
+
+# Máximo de confirmaciones agrupadas en un solo GATT write
+BATCH_MAX_COMMANDS = 4
+
 # ADB
 ADB_CMD = "adb"
-
-# Logging
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s [%(levelname)s] %(message)s",
+# Ruta absoluta: CPython solo usa posix_spawn() si el ejecutable la tiene
+ADB_PATH = shutil.which(ADB_CMD) or ADB_CMD
+
+# Logging: los callbacks BLE solo encolan el record; un hilo del
+# QueueListener formatea y escribe a stderr sin bloquear el loop asyncio.
+_log_queue: queue.SimpleQueue = queue.SimpleQueue()
+_log_stream = logging.StreamHandler()
+_log_stream.setFormatter(logging.Formatter(
+    "%(asctime)s [%(levelname)s] %(message)s",
     datefmt="%H:%M:%S",
-)
+))
+_log_listener = logging.handlers.QueueListener(_log_queue, _log_stream)
+logging.root.setLevel(logging.INFO)
+logging.root.addHandler(logging.handlers.QueueHandler(_log_queue))
+_log_listener.start()
+atexit.register(_log_listener.stop)
 log = logging.getLogger("ble-bridge")
 
 # Estado global
@@ -81,23 +121,116 @@ signal.signal(signal.SIGTERM, signal_handler)
 
 # ─── ADB Helpers ─────────────────────────────────────────────
 
-def adb_exec(command: str) -> tuple[bool, str]:
-    """Ejecuta un comando ADB y retorna (success, output)."""
-    full_cmd = f"{ADB_CMD} shell {command}"
-    log.info(f"ADB exec: {full_cmd}")
-    try:
-        result = subprocess.run(
-            full_cmd.split(),
-            capture_output=True,
-            text=True,
-            timeout=10,
+# Marca que se imprime tras cada comando en el shell persistente
+ADB_SENTINEL = b"__END__:"
+
+
+class AdbShell:
+    """
+    Proceso `adb shell` de larga vida.
+
+    Evita el fork/exec de adb y el handshake con el dispositivo en cada
+    comando: los comandos se escriben por stdin y la salida se lee hasta
+    ADB_SENTINEL, seguido del código de salida.
+    """
+
+    def __init__(self):
+        self.proc: Optional[asyncio.subprocess.Process] = None
+        self.lock = asyncio.Lock()
+
+    @property
+    def alive(self) -> bool:
+        return self.proc is not None and self.proc.returncode is None
+
+    async def open(self):
+        """Lanza el proceso `adb shell`."""
+        self.proc = await asyncio.create_subprocess_exec(
+            ADB_PATH, "shell",
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL,
+            close_fds=False,
         )
-        output = result.stdout.strip()
-        success = result.returncode == 0
+        log.info(f"ADB shell persistente abierto (pid={self.proc.pid})")
+
+    async def ensure_open(self):
+        """Reabre el shell si murió o se cerró (p. ej. tras un timeout)."""
+        async with self.lock:
+            if not self.alive:
+                await self.open()
+
+    async def close(self):
+        """Cierra el proceso `adb shell`."""
+        if self.alive:
+            try:
+                self.proc.stdin.close()
+                await asyncio.wait_for(self.proc.wait(), timeout=2)
+            except Exception:
+                self.proc.kill()
+        self.proc = None
+
+    async def exec(self, command: str, timeout: float = 10.0) -> tuple[bool, str]:
+        """Ejecuta un comando en el shell y retorna (success, output)."""
+        async with self.lock:
+            # Otro comando pudo cerrar el shell (timeout) mientras se esperaba
+            if not self.alive:
+                raise ConnectionError("adb shell cerrado")
+
+            self.proc.stdin.write(f"{command}; echo {ADB_SENTINEL.decode()}$?\n".encode())
+            await self.proc.stdin.drain()
+
+            try:
+                output = await asyncio.wait_for(
+                    self.proc.stdout.readuntil(ADB_SENTINEL), timeout
+                )
+                rc = await asyncio.wait_for(self.proc.stdout.readline(), timeout)
+            except asyncio.TimeoutError:
+                # Estado del shell desconocido: descartarlo
+                await self.close()
+                raise
+            except asyncio.IncompleteReadError:
+                raise ConnectionError("adb shell terminó")
+
+        output = output[:-len(ADB_SENTINEL)]
+        return rc.strip() == b"0", output.decode("utf-8", "replace").strip()
+
+
+adb_shell = AdbShell()
+
+
+async def adb_exec(*argv: str) -> tuple[bool, str]:
+    """
+    Ejecuta un comando ADB y retorna (success, output).
+
+    `argv` se cita una sola vez con shlex.join: el shell del dispositivo
+    recibe la misma línea tanto por el shell persistente como por one-shot.
+    """
+    command = shlex.join(argv)
+    log.info(f"ADB exec: {ADB_CMD} shell {command}")
+    try:
+        if not adb_shell.alive:
+            try:
+                await adb_shell.ensure_open()
+            except Exception as e:
+                log.warning(f"No se pudo reabrir ADB shell persistente ({e}), usando one-shot")
+        if adb_shell.alive:
+            try:
+                success, output = await adb_shell.exec(command)
+            except asyncio.TimeoutError:
+                # En 3.11+ TimeoutError hereda de OSError: no reintentar
+                # one-shot un comando que pudo haberse ejecutado
+                raise
+            except (OSError, ConnectionError) as e:
+                # El shell persistente murió: usar adb one-shot
+                log.warning(f"ADB shell persistente caído ({e}), usando one-shot")
+                await adb_shell.close()
+                success, output = await _adb_exec_oneshot(command)
+        else:
+            success, output = await _adb_exec_oneshot(command)
         if output:
             log.info(f"ADB output: {output}")
         return success, output
-    except subprocess.TimeoutExpired:
+    except asyncio.TimeoutError:
         log.error("ADB timeout")
         return False, "timeout"
     except Exception as e:
@@ -105,43 +238,92 @@ def adb_exec(command: str) -> tuple[bool, str]:
         return False, str(e)
 
 
-def handle_radio_request(action: str, reason: str) -> dict:
+async def _adb_exec_oneshot(command: str, timeout: float = 10.0) -> tuple[bool, str]:
     """
-    Procesa un radio-request del teléfono y ejecuta ADB.
-    Retorna el comando de confirmación para enviar al teléfono.
+    Lanza un proceso adb por comando (fallback sin shell persistente).
+
+    `command` es una línea ya citada: adb shell concatena sus argumentos en
+    el dispositivo, así que se pasa como un único argumento.
+
+    close_fds=False permite a CPython usar posix_spawn() en lugar de
+    fork+exec. Heredar FDs es aceptable: el bridge solo tiene abiertos
+    logging y los sockets BLE, nada sensible para adb.
     """
-    log.info(f"Radio request: action={action}, reason={reason}")
+    proc = await asyncio.create_subprocess_exec(
+        ADB_PATH, "shell", command,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+        close_fds=False,
+    )
+    try:
+        stdout, _ = await asyncio.wait_for(proc.communicate(), timeout)
+    except asyncio.TimeoutError:
+        proc.kill()
+        await proc.wait()
+        raise
+    return proc.returncode == 0, stdout.decode("utf-8", "replace").strip()
 
-    if action == "enable_bt":
-        success, _ = adb_exec("svc bluetooth enable")
-        if success:
-            # Esperar a que el radio se encienda
-            time.sleep(2)
-            return {"action": "BT_READY", "sessionId": "ble-bridge", "reason": "ADB enable_bt OK"}
-        else:
-            return {"action": "BT_READY", "sessionId": "ble-bridge", "reason": "ADB enable_bt FAILED"}
-
-    elif action == "disable_bt":
-        success, _ = adb_exec("svc bluetooth disable")
-        return {"action": "BT_DISABLED", "sessionId": "ble-bridge",
-                "reason": f"ADB disable_bt {'OK' if success else 'FAILED'}"}
-
-    elif action == "enable_wifi":
-        success, _ = adb_exec("svc wifi enable")
-        if success:
-            time.sleep(3)  # WiFi tarda más en estabilizarse
-            return {"action": "WIFI_READY", "sessionId": "ble-bridge", "reason": "ADB enable_wifi OK"}
-        else:
-            return {"action": "WIFI_READY", "sessionId": "ble-bridge", "reason": "ADB enable_wifi FAILED"}
 
-    elif action == "disable_wifi":
-        success, _ = adb_exec("svc wifi disable")
-        return {"action": "WIFI_DISABLED", "sessionId": "ble-bridge",
-                "reason": f"ADB disable_wifi {'OK' if success else 'FAILED'}"}
+def _confirmation(action: str, reason: str) -> bytes:
+    """Serializa un comando de confirmación para el teléfono."""
+    return _json_dumps({"action": action, "sessionId": "ble-bridge", "reason": reason})
+
+
+# Radio-requests soportados:
+#   action → (radio, argv de adb shell, espera tras OK en s, acción de confirmación)
+_RADIO_TABLE = {
+    "enable_bt": ("bt", ("svc", "bluetooth", "enable"), 2.0, "BT_READY"),     # Esperar a que el radio se encienda
+    "disable_bt": ("bt", ("svc", "bluetooth", "disable"), 0, "BT_DISABLED"),
+    "enable_wifi": ("wifi", ("svc", "wifi", "enable"), 3.0, "WIFI_READY"),    # WiFi tarda más en estabilizarse
+    "disable_wifi": ("wifi", ("svc", "wifi", "disable"), 0, "WIFI_DISABLED"),
+}
+
+
+def radio_of(action: str) -> Optional[str]:
+    """Radio ("bt"/"wifi") que afecta `action`, o None si es desconocida."""
+    entry = _RADIO_TABLE.get(action)
+    return entry[0] if entry else None
+
 
-    else:
+def _make_radio_handler(argv: tuple[str, ...], wait_s: float, ok: bytes, failed: bytes):
+    """
+    Crea la corrutina especializada de una acción de radio, con argv,
+    espera y confirmaciones (ya serializadas) ligadas de antemano.
+    """
+    async def handler() -> bytes:
+        success, _ = await adb_exec(*argv)
+        if success and wait_s:
+            await asyncio.sleep(wait_s)
+        return ok if success else failed
+
+    return handler
+
+
+# Un handler por acción, construido una sola vez al importar
+_RADIO_HANDLERS = {
+    action: _make_radio_handler(
+        argv,
+        wait_s,
+        _confirmation(resp, f"ADB {action} OK"),
+        _confirmation(resp, f"ADB {action} FAILED"),
+    )
+    for action, (_, argv, wait_s, resp) in _RADIO_TABLE.items()
+}
+
+
+async def handle_radio_request(action: str, reason: str) -> bytes:
+    """
+    Procesa un radio-request del teléfono y ejecuta ADB.
+    Retorna el comando de confirmación (ya serializado) para enviar al teléfono.
+    """
+    log.info(f"Radio request: action={action}, reason={reason}")
+
+    handler = _RADIO_HANDLERS.get(action)
+    if handler is None:
         log.warning(f"Radio request desconocido: {action}")
-        return {"action": "UNKNOWN", "sessionId": "ble-bridge", "reason": f"Unknown action: {action}"}
+        return _confirmation("UNKNOWN", f"Unknown action: {action}")
+
+    return await handler()
 
 
 # ─── BLE GATT Client ────────────────────────────────────────
@@ -159,39 +341,81 @@ class SdnBleController:
     def __init__(self):
         self.client: Optional[BleakClient] = None
         self.connected = False
-        self.pending_commands: list[dict] = []
+        self.pending_commands: asyncio.Queue[bytes] = asyncio.Queue()
+        # Referencias a tasks en curso (evita que el GC las cancele)
+        self._tasks: set[asyncio.Task] = set()
+        # Un lock por radio: los requests del mismo radio se ejecutan y
+        # confirman en orden de llegada; radios distintos van en paralelo
+        self._radio_locks: dict[Optional[str], asyncio.Lock] = defaultdict(asyncio.Lock)
+        # Último radio-request despachado por radio: (acción, future),
+        # para coalescer duplicados
+        self._inflight: dict[Optional[str], tuple[str, asyncio.Future]] = {}
+        # Servicios ya listados en el log (no repetir en reconexiones)
+        self._services_logged = False
+        # Características SDN resueltas (evita el lookup UUID → handle)
+        self._chars: dict[str, BleakGATTCharacteristic] = {}
+
+    async def scan_for_sdn_devices(self, timeout: float = 10.0, stop_on_first: bool = False) -> list[tuple[BLEDevice, int]]:
+        """
+        Escanea dispositivos BLE que anuncian el servicio SDN.
+
+        Con stop_on_first=True el scan termina apenas aparece el primer
+        dispositivo SDN, sin esperar el timeout completo, y se filtra por
+        UUID de servicio en el SO para que lleguen menos advertisements.
 
-    async def scan_for_sdn_devices(self, timeout: float = 10.0) -> list:
-        """Escanea dispositivos BLE que anuncian el servicio SDN."""
+        Retorna pares (device, rssi): el RSSI viene del advertisement,
+        BLEDevice ya no lo expone.
+        """
         log.info(f"Escaneando dispositivos SDN (timeout={timeout}s)...")
 
-        devices = []
-        discovered = await BleakScanner.discover(timeout=timeout)
+        devices: dict[str, tuple[BLEDevice, int]] = {}
+        hinted: set[str] = set()
+        found = asyncio.Event()
 
-        for d in discovered:
-            uuids = d.metadata.get("uuids", [])
-            # Normalizar UUIDs a minúsculas
-            uuids_lower = [u.lower() for u in uuids]
+        def on_detection(d: BLEDevice, adv: AdvertisementData):
+            if d.address in devices:
+                return
 
-            if SDN_SERVICE_UUID.lower() in uuids_lower:
-                devices.append(d)
-                log.info(f"  ✓ SDN Device: {d.name or 'Unknown'} ({d.address}) RSSI={d.rssi}")
-            else:
+            # Normalizar UUIDs a minúsculas (corta en el primer match)
+            if any(u.lower() == SDN_SERVICE_UUID_LC for u in adv.service_uuids):
+                devices[d.address] = (d, adv.rssi)
+                log.info(f"  ✓ SDN Device: {d.name or 'Unknown'} ({d.address}) RSSI={adv.rssi}")
+                found.set()
+            elif d.address not in hinted:
                 # También buscar por nombre parcial como fallback
                 name = (d.name or "").lower()
-                if "sdn" in name or "xiaomi" in name:
-                    log.info(f"  ? Posible: {d.name or 'Unknown'} ({d.address}) RSSI={d.rssi}")
+                if any(h in name for h in _SDN_NAME_HINTS):
+                    hinted.add(d.address)
+                    log.debug(f"  ? Posible: {d.name or 'Unknown'} ({d.address}) RSSI={adv.rssi}")
+
+        # El filtro por UUID descarta el fallback por nombre, así que el
+        # modo --scan (diagnóstico) no filtra: con -v muestra los "? Posible"
+        scanner = BleakScanner(
+            detection_callback=on_detection,
+            service_uuids=[SDN_SERVICE_UUID] if stop_on_first else None,
+        )
+        await scanner.start()
+        try:
+            if stop_on_first:
+                await asyncio.wait_for(found.wait(), timeout)
+            else:
+                await asyncio.sleep(timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            await scanner.stop()
 
         if not devices:
             log.warning("No se encontraron dispositivos SDN")
 
-        return devices
+        return list(devices.values())
 
     def _on_response_notify(self, sender: BleakGATTCharacteristic, data: bytearray):
         """Callback cuando el teléfono envía una response/telemetría."""
         try:
-            json_str = data.decode("utf-8")
-            log.info(f"📱 Response: {json_str[:200]}")
+            # Decodificar solo el prefijo que se loguea, no el payload completo
+            preview = data[:200].decode("utf-8", "replace")
+            log.info(f"📱 Response: {preview}")
             # Aquí se podría publicar a MQTT local o procesar
         except Exception as e:
             log.error(f"Error parseando response: {e}")
@@ -199,21 +423,61 @@ class SdnBleController:
     def _on_radio_request_notify(self, sender: BleakGATTCharacteristic, data: bytearray):
         """
         Callback cuando el teléfono solicita un toggle de radio.
-        Ejecuta ADB y envía confirmación de vuelta.
+        Agenda la ejecución de ADB sin bloquear el loop BLE.
         """
         try:
-            json_str = data.decode("utf-8")
-            log.info(f"📱 Radio Request: {json_str}")
+            preview = data[:200].decode("utf-8", "replace")
+            log.info(f"📱 Radio Request: {preview}")
+
+            # orjson y json aceptan el bytearray directamente
+            request = _json_loads(data)
+            task = asyncio.create_task(self._process_radio_request(request))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+        except Exception as e:
+            log.error(f"Error procesando radio request: {e}")
+
+    async def _process_radio_request(self, request: dict):
+        """
+        Ejecuta ADB para un radio-request y encola la confirmación.
 
-            request = json.loads(json_str)
+        Los requests de un mismo radio se serializan con su lock; los de
+        radios distintos corren en paralelo.
+
+        Un request se coalesce con el último despachado para su radio si es
+        la misma acción: espera su resultado sin lanzar otro ADB (la
+        confirmación del original cubre a ambos). Un request de otra acción
+        sobre ese radio (p. ej. disable_bt tras enable_bt) reemplaza la
+        entrada, así que el siguiente duplicado vuelve a ejecutar ADB.
+        """
+        try:
             action = request.get("action", "unknown")
             reason = request.get("reason", "")
+            radio = radio_of(action)
 
-            # Ejecutar ADB
-            confirmation = handle_radio_request(action, reason)
+            entry = self._inflight.get(radio)
+            if entry is not None and entry[0] == action:
+                log.info(f"Radio request {action} ya en curso — coalescido")
+                await entry[1]
+                return
 
-            # Enviar confirmación al teléfono
-            self.pending_commands.append(confirmation)
+            entry = (action, asyncio.get_running_loop().create_future())
+            self._inflight[radio] = entry
+            try:
+                # ADB + espera + encolado bajo el lock del radio, para que la
+                # última confirmación refleje el último request
+                async with self._radio_locks[radio]:
+                    # Ejecutar ADB
+                    confirmation = await handle_radio_request(action, reason)
+
+                    # Enviar confirmación al teléfono
+                    self.pending_commands.put_nowait(confirmation)
+            finally:
+                # Solo si nadie la reemplazó con otra acción mientras tanto
+                if self._inflight.get(radio) is entry:
+                    del self._inflight[radio]
+                entry[1].set_result(None)
 
         except Exception as e:
             log.error(f"Error procesando radio request: {e}")
@@ -222,7 +486,10 @@ class SdnBleController:
         """Conecta al GATT Server SDN del teléfono."""
         log.info(f"Conectando a {address}...")
 
-        self.client = BleakClient(address, timeout=timeout)
+        # Reutilizar el cliente en reconexiones al mismo dispositivo
+        if self.client is None or self.client.address != address:
+            self.client = BleakClient(address, timeout=timeout, services=[SDN_SERVICE_UUID])
+            self._services_logged = False
         await self.client.connect()
 
         if not self.client.is_connected:
@@ -231,41 +498,100 @@ class SdnBleController:
         self.connected = True
         log.info(f"✓ Conectado a {address}")
 
-        # Listar servicios
-        for service in self.client.services:
-            log.info(f"  Service: {service.uuid}")
-            for char in service.characteristics:
-                props = ",".join(char.properties)
-                log.info(f"    Char: {char.uuid} [{props}]")
+        await self._negotiate_mtu()
+
+        # Listar servicios (solo en la primera conexión)
+        if not self._services_logged:
+            for service in self.client.services:
+                log.info(f"  Service: {service.uuid}")
+                for char in service.characteristics:
+                    props = ",".join(char.properties)
+                    log.info(f"    Char: {char.uuid} [{props}]")
+            self._services_logged = True
+
+        # Resolver características SDN. Los handles pueden cambiar entre
+        # conexiones, así que se refrescan desde los servicios ya descubiertos.
+        self._chars = {}
+        for uuid in (SDN_CMD_WRITE_UUID, SDN_RESPONSE_UUID, SDN_RADIO_REQ_UUID):
+            char = self.client.services.get_characteristic(uuid)
+            if char is not None:
+                self._chars[uuid] = char
 
         # Suscribirse a notificaciones
         try:
-            await self.client.start_notify(SDN_RESPONSE_UUID, self._on_response_notify)
+            await self.client.start_notify(self._char(SDN_RESPONSE_UUID), self._on_response_notify)
             log.info("✓ Suscrito a RESPONSE notifications")
         except Exception as e:
             log.warning(f"No se pudo suscribir a RESPONSE: {e}")
 
         try:
-            await self.client.start_notify(SDN_RADIO_REQ_UUID, self._on_radio_request_notify)
+            await self.client.start_notify(self._char(SDN_RADIO_REQ_UUID), self._on_radio_request_notify)
             log.info("✓ Suscrito a RADIO_REQUEST notifications")
         except Exception as e:
             log.warning(f"No se pudo suscribir a RADIO_REQUEST: {e}")
 
-    async def send_command(self, command: dict):
-        """Envía un comando SDN al teléfono vía GATT write."""
+    def _char(self, uuid: str):
+        """Característica resuelta para `uuid`, o el UUID si no se encontró."""
+        return self._chars.get(uuid, uuid)
+
+    async def _negotiate_mtu(self):
+        """
+        Obtiene el ATT MTU negociado para evitar fragmentar los JSON.
+
+        BlueZ negocia el MTU en el kernel pero Bleak reporta 23 hasta que se
+        adquiere explícitamente; CoreBluetooth y WinRT lo negocian solos.
+        """
+        backend = getattr(self.client, "_backend", None)
+        if hasattr(backend, "_acquire_mtu"):
+            try:
+                await backend._acquire_mtu()
+            except Exception as e:
+                log.warning(f"No se pudo adquirir MTU: {e}")
+
+        mtu = self.client.mtu_size
+        log.info(f"  ATT MTU: {mtu}")
+        if mtu < MIN_RECOMMENDED_MTU:
+            log.warning(f"MTU bajo ({mtu}) — los JSON se fragmentarán en varios paquetes")
+
+    async def send_command(self, command: Union[dict, bytes], reliable: bool = False):
+        """
+        Envía un comando SDN al teléfono vía GATT write.
+
+        `command` puede ser un dict o un JSON ya serializado (bytes), en cuyo
+        caso se escribe tal cual.
+
+        Con reliable=False se usa Write-Without-Response si la característica
+        lo anuncia: las confirmaciones ya tienen su propio ACK de aplicación
+        vía RESPONSE notifications, así que no hace falta pagar el round trip
+        del ACK GATT.
+        """
         if not self.client or not self.client.is_connected:
             log.error("No conectado — no se puede enviar comando")
             return
 
-        json_bytes = json.dumps(command).encode("utf-8")
+        json_bytes = command if isinstance(command, bytes) else _json_dumps(command)
+
+        # Write-Without-Response solo si la característica lo soporta y el
+        # payload cabe en un paquete (no se fragmenta); si no, write con
+        # response (long write). mtu_size no sirve aquí: BlueZ reporta 23.
+        char = self._char(SDN_CMD_WRITE_UUID)
+        if not reliable and not (
+            isinstance(char, BleakGATTCharacteristic)
+            and "write-without-response" in char.properties
+            and len(json_bytes) <= char.max_write_without_response_size
+        ):
+            reliable = True
 
         try:
             await self.client.write_gatt_char(
-                SDN_CMD_WRITE_UUID,
+                char,
                 json_bytes,
-                response=True  # With response para confirmar
+                response=reliable,
             )
-            log.info(f"→ Comando enviado: {command.get('action', 'unknown')}")
+            if isinstance(command, bytes):
+                log.info(f"→ Comando enviado: {json_bytes[:200].decode('utf-8', 'replace')}")
+            else:
+                log.info(f"→ Comando enviado: {command.get('action', 'unknown')}")
         except Exception as e:
             log.error(f"Error enviando comando: {e}")
 
@@ -275,12 +601,26 @@ class SdnBleController:
         log.info("  Ctrl+C para salir")
 
         while running and self.client and self.client.is_connected:
-            # Enviar pending commands (confirmaciones de radio-requests)
-            while self.pending_commands:
-                cmd = self.pending_commands.pop(0)
+            # Esperar pending commands (confirmaciones de radio-requests).
+            # El timeout solo sirve para revisar `running` periódicamente.
+            try:
+                cmd = await asyncio.wait_for(self.pending_commands.get(), timeout=1.0)
+            except asyncio.TimeoutError:
+                continue
+
+            # Agrupar las confirmaciones que ya estén en cola en un solo write.
+            # La app desempaqueta el sobre {"action": "batch", "batch": [...]}
+            # en CommandHandler.handle (parseGattCommand / Command.batch).
+            batch = [cmd]
+            while not self.pending_commands.empty() and len(batch) < BATCH_MAX_COMMANDS:
+                batch.append(self.pending_commands.get_nowait())
+
+            if len(batch) == 1:
                 await self.send_command(cmd)
-
-            await asyncio.sleep(0.5)
+            else:
+                await self.send_command(
+                    b'{"action":"batch","batch":[' + b",".join(batch) + b"]}"
+                )
 
         log.info("Loop terminado")
 
@@ -307,6 +647,7 @@ async def main():
 Ejemplos:
   %(prog)s                              Busca y conecta automáticamente
   %(prog)s --scan                       Solo escanea dispositivos BLE
+  %(prog)s --scan -v                    Incluye candidatos por nombre (debug)
   %(prog)s --mac AA:BB:CC:DD:EE:FF      Conecta a MAC específica
   %(prog)s --send '{"action":"PREPARE_BT","sessionId":"test"}'
         """,
@@ -315,9 +656,14 @@ Ejemplos:
     parser.add_argument("--mac", type=str, help="MAC del teléfono (evita scan)")
     parser.add_argument("--send", type=str, help="Envía un comando JSON y sale")
     parser.add_argument("--timeout", type=float, default=10.0, help="Timeout de scan (default: 10s)")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Log nivel DEBUG del bridge")
 
     args = parser.parse_args()
 
+    if args.verbose:
+        # Solo el logger del bridge: bleak en DEBUG inunda la salida
+        log.setLevel(logging.DEBUG)
+
     controller = SdnBleController()
 
     # ── Modo SCAN ──
@@ -325,8 +671,8 @@ Ejemplos:
         devices = await controller.scan_for_sdn_devices(timeout=args.timeout)
         if devices:
             print(f"\n{len(devices)} dispositivo(s) SDN encontrado(s):")
-            for d in devices:
-                print(f"  {d.name or 'Unknown':20s} {d.address}  RSSI={d.rssi}")
+            for d, rssi in devices:
+                print(f"  {d.name or 'Unknown':20s} {d.address}  RSSI={rssi}")
         else:
             print("\nNo se encontraron dispositivos SDN.")
             print("Asegúrate de que:")
@@ -340,13 +686,14 @@ Ejemplos:
 
     if not target_address:
         log.info("Buscando teléfono SDN...")
-        devices = await controller.scan_for_sdn_devices(timeout=args.timeout)
+        devices = await controller.scan_for_sdn_devices(timeout=args.timeout, stop_on_first=True)
         if not devices:
             log.error("No se encontró el teléfono SDN. ¿Está advertiseando?")
             log.info("Tip: Ejecuta 'ble start' en la consola de la app")
             return
-        target_address = devices[0].address
-        log.info(f"Usando primer dispositivo: {devices[0].name} ({target_address})")
+        device, _ = devices[0]
+        target_address = device.address
+        log.info(f"Usando primer dispositivo: {device.name} ({target_address})")
 
     # ── Conectar ──
     try:
@@ -359,7 +706,7 @@ Ejemplos:
     if args.send:
         try:
             command = json.loads(args.send)
-            await controller.send_command(command)
+            await controller.send_command(command, reliable=True)
             log.info("Comando enviado, esperando 3s para response...")
             await asyncio.sleep(3)
         except json.JSONDecodeError as e:
@@ -369,6 +716,11 @@ Ejemplos:
         return
 
     # ── Modo BRIDGE (principal) ──
+    try:
+        await adb_shell.open()
+    except Exception as e:
+        log.warning(f"No se pudo abrir ADB shell persistente ({e}), usando one-shot")
+
     try:
         await controller.run_loop()
     except KeyboardInterrupt:
@@ -377,6 +729,7 @@ Ejemplos:
         log.error(f"Error en loop: {e}")
     finally:
         await controller.disconnect()
+        await adb_shell.close()
         log.info("Bridge cerrado")
 
 
@@ -3,11 +3,18 @@ package org.sdn.sdn_mobile_agent.data.model
 /**
  * Comando recibido del controlador SDN vía MQTT.
  * Tópico: dispositivo/{MAC}/comando
+ *
+ * Con action = "batch", [batch] trae varios comandos en un solo mensaje
+ * (el BLE bridge agrupa confirmaciones en un único GATT write).
  */
 data class Command(
     val sessionId: String = "",
     val action: String = "",
     val ssid: String? = null,
     val password: String? = null,
-    val reason: String? = null
-)
+    val reason: String? = null,
+    val batch: List<Command>? = null
+) {
+    /** Comandos contenidos: los del sobre "batch", o este mismo. */
+    fun commands(): List<Command> = batch ?: listOf(this)
+}
@@ -33,6 +33,7 @@ import org.sdn.sdn_mobile_agent.data.model.Command
  * - WIFI_DISABLED: Controlador confirma WiFi apagado vía ADB.
  * - SWITCH_WIFI: Conecta a una red WiFi específica (datos).
  * - RELEASE_RADIO: Apaga WiFi datos + detiene BLE scan/adv.
+ * - batch: Sobre con varios comandos; se procesan en orden.
  */
 class CommandHandler(
     private val radioController: RadioController,
@@ -81,6 +82,8 @@ class CommandHandler(
             "SWITCH_WIFI"    -> handleSwitchWifi(command)
             // ── General ──
             "RELEASE_RADIO"  -> handleReleaseRadio(command)
+            // ── Sobre con varios comandos (BLE bridge) ──
+            "batch"          -> command.batch?.forEach { handle(it) }
             else -> {
                 Log.w(TAG, "Acción desconocida: ${command.action}")
                 onLog("Acción desconocida: ${command.action}")
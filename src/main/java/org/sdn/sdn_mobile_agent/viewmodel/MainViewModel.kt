@@ -25,6 +25,7 @@ import java.io.File
 import java.io.FileOutputStream
 import java.text.SimpleDateFormat
 import java.util.*
+import org.json.JSONArray
 import org.json.JSONObject
 
 /**
@@ -151,7 +152,7 @@ class MainViewModel(application: Application) : AndroidViewModel(application) {
                     addLog("⬇ Control CDN vía BLE: ${command.action}")
                     commandHandler.handle(command)
                     // Si llega WIFI_READY y hay contenido pendiente → descargar
-                    if (command.action == "WIFI_READY") {
+                    if (command.commands().any { it.action == "WIFI_READY" }) {
                         onWifiReadyForContent()
                     }
                 }
@@ -174,7 +175,7 @@ class MainViewModel(application: Application) : AndroidViewModel(application) {
                 addLog("⬇ Comando vía MQTT: ${command.action}")
                 commandHandler.handle(command)
                 // Si llega WIFI_READY y hay contenido pendiente → descargar
-                if (command.action == "WIFI_READY") {
+                if (command.commands().any { it.action == "WIFI_READY" }) {
                     onWifiReadyForContent()
                 }
             }
@@ -325,6 +326,14 @@ class MainViewModel(application: Application) : AndroidViewModel(application) {
     private fun parseGattCommand(json: String): Command {
         // Parse simple sin dependencias extras
         val action = extractJsonField(json, "action") ?: "UNKNOWN"
+        if (action == "batch") {
+            // Sobre {"action":"batch","batch":[{...}, ...]} del BLE bridge
+            val items = JSONObject(json).optJSONArray("batch") ?: JSONArray()
+            val batch = (0 until items.length()).map { i ->
+                parseGattCommand(items.getJSONObject(i).toString())
+            }
+            return Command(sessionId = "ble-bridge", action = action, batch = batch)
+        }
         val sessionId = extractJsonField(json, "sessionId") ?: "ble-ctrl"
         val ssid = extractJsonField(json, "ssid")
         val password = extractJsonField(json, "password")